@@ -20,6 +20,8 @@ Dependencies
 ------------
 
 Pyglet
+NumPy
+Numba (optional, compiles the Hermite curve interpolation)
 
 Testing
 -------
@@ -28,7 +30,12 @@ It was written using Python 2.6 on Windows and has not been tested on other
 platforms.
 """
 
-import random, math, sys
+import math, sys, ctypes
+import numpy as np
+try:
+    import numba
+except ImportError:
+    numba = None
 import pyglet
 from pyglet.window import key, mouse
 from pyglet.gl import *
@@ -40,6 +47,8 @@ CURVE_SECTIONS = CURVE_MARGIN_SECTIONS + CURVE_DISPLAY_SECTIONS + CURVE_MARGIN_S
 CURVE_SECTION_SUBDIVISIONS = 20
 CURVE_POINTS = CURVE_SECTIONS + 1
 CURVE_SUBDIVISION_FRACTION = 1.0 / CURVE_SECTION_SUBDIVISIONS
+CURVE_LINE_VERTICES = (CURVE_SECTIONS - 1) * CURVE_SECTION_SUBDIVISIONS + 1
+CURVE_MAX_VERTICES = CURVE_LINE_VERTICES + 2   # Plus the points clipped to the display area.
 
 INITIAL_CURVE_SCROLL_PERIOD = 3.0
 INITIAL_CURVE_SCROLL_DIRECTION = 1.0
@@ -51,13 +60,11 @@ CURVE_Y0 = CURVE_Y_MARGIN
 CURVE_Y1 = CURVE_Y0 + CURVE_HEIGHT
 
 SLIDER_RADIUS = 4
+CIRCLE_RESOLUTION = 60                  # How many segments circles are drawn with.
 
 NORMAL_COLOUR = (1.0, 1.0, 1.0, 1.0)
 BORDER_COLOUR = (0.7, 0.7, 0.7, 1.0)
 
-NORMAL_DRAW_STYLE = GLU_FILL            # Draw style when not being dragged.
-SELECTED_DRAW_STYLE = GLU_SILHOUETTE    # Draw style when being dragged.
-
 NUM_LINE_TYPES = 3
 LINES_LINEAR, LINES_SMOOTHSTEP, LINES_HERMITE = range(NUM_LINE_TYPES)
 
@@ -70,14 +77,19 @@ line_labels = {
 }
 
 
-class Vector2D:
-    def __init__(self, *args):
-        if len(args) == 1 and type(args[0]) is type(self):
-            self.x = args[0].x
-            self.y = args[0].y
-        else:
-            self.x = args[0]
-            self.y = args[1]
+class Vector2D(object):
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def copy(cls, other):
+        v = cls.__new__(cls)
+        v.x = other.x
+        v.y = other.y
+        return v
 
     def __str__(self):
         return "(%0.2f, %0.2f)" % (self.x, self.y)
@@ -86,35 +98,24 @@ class Vector2D:
         yield self.x
         yield self.y
 
+    # Vectors are only ever multiplied or divided by numbers, anything
+    # else fails with a TypeError from the arithmetic itself.
     def __mul__(self, other):
-        v = Vector2D(self.x, self.y)
-        if type(other) in (float, int):
-            v.x *= other
-            v.y *= other
-        else:
-            raise Exception("unhandled operation", self, other)
-        return v
+        return Vector2D(self.x * other, self.y * other)
 
-    def __div__(self, other):
-        v = Vector2D(self.x, self.y)
-        if type(other) in (float, int):
-            v.x /= other
-            v.y /= other
-        else:
-            raise Exception("unhandled operation", self, other)
-        return v
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Vector2D(self.x / other, self.y / other)
+
+    # Python 2 only calls __div__.
+    __div__ = __truediv__
         
     def __add__(self, other):
-        v = Vector2D(self.x, self.y)
-        v.x += other.x
-        v.y += other.y
-        return v
+        return Vector2D(self.x + other.x, self.y + other.y)
 
     def __sub__(self, other):
-        v = Vector2D(self.x, self.y)
-        v.x -= other.x
-        v.y -= other.y
-        return v    
+        return Vector2D(self.x - other.x, self.y - other.y)
 
     def length2(self):
         return self.x * self.x + self.y * self.y
@@ -123,44 +124,132 @@ class Vector2D:
         return math.sqrt(self.length2())
 
     def normalise(self):
-        length = self.length()
-        return Vector2D(self.x/length, self.y/length)
+        scale = 1.0 / math.sqrt(self.x * self.x + self.y * self.y)
+        return Vector2D(self.x * scale, self.y * scale)
 
     def dot_product(self, other):
         return self.x * other.x + self.y * other.y
 
     def angle_between(self, other):
-        return math.acos(self.dot_product(other) / (self.length2() + other.length2()))
+        length2 = (self.x * self.x + self.y * self.y) * (other.x * other.x + other.y * other.y)
+        cosine = (self.x * other.x + self.y * other.y) / math.sqrt(length2)
+        # Rounding can take the cosine just outside the range acos accepts.
+        return math.acos(max(-1.0, min(cosine, 1.0)))
 
 ## Interpolation.
 
+def jit(*args):
+    """
+    Compile the decorated function with Numba when it is available,
+    otherwise leave it to run as normal Python.
+    """
+    if numba is None:
+        return lambda function: function
+    return numba.njit(*args, cache=True, fastmath=True)
+
 def smooth_step_interpolation(v):
     return (v * v * (3.0 - 2.0 * v))
 
-def hermite_interpolation(p0, p1, p2, p3, mu, tension, bias):
+# The Hermite basis functions only depend on how far along a section the
+# step is, so they are the same for every section and every frame.
+SECTION_MU = np.arange(1, CURVE_SECTION_SUBDIVISIONS + 1) * CURVE_SUBDIVISION_FRACTION
+SECTION_MU2 = SECTION_MU * SECTION_MU
+SECTION_MU3 = SECTION_MU2 * SECTION_MU
+HERMITE_A0 =  2.0*SECTION_MU3 - 3.0*SECTION_MU2 + 1.0
+HERMITE_A1 =      SECTION_MU3 - 2.0*SECTION_MU2 + SECTION_MU
+HERMITE_A2 =      SECTION_MU3 -     SECTION_MU2
+HERMITE_A3 = -2.0*SECTION_MU3 + 3.0*SECTION_MU2
+HERMITE_BASIS = np.column_stack((HERMITE_A0, HERMITE_A1, HERMITE_A2, HERMITE_A3))
+
+# The smooth step scalars are fixed in the same way.
+SMOOTH_STEP_TABLE = smooth_step_interpolation(SECTION_MU)
+
+def hermite_tangent_factors(tension, bias):
+    kT = (1.0 - tension) * 0.5
+    return (1.0 + bias) * kT, (1.0 - bias) * kT
+
+@jit("UniTuple(f8, 2)(f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8)")
+def hermite_interpolation(p0x, p0y, p1x, p1y, p2x, p2y, p3x, p3y, a0, a1, a2, a3, kPB, kMB):
     """
     Taken from:
       http://local.wasp.uwa.edu.au/~pbourke/miscellaneous/interpolation/
+
+    The points are passed as separate components, along with the basis
+    function values for the step and the tangent factors from
+    hermite_tangent_factors, and the interpolated point is returned as
+    an (x, y) tuple.
+    """
+    m0x = (p1x-p0x)*kPB + (p2x-p1x)*kMB
+    m0y = (p1y-p0y)*kPB + (p2y-p1y)*kMB
+    m1x = (p2x-p1x)*kPB + (p3x-p2x)*kMB
+    m1y = (p2y-p1y)*kPB + (p3y-p2y)*kMB
+
+    return (p1x*a0 + m0x*a1 + m1x*a2 + p2x*a3,
+            p1y*a0 + m0y*a1 + m1y*a2 + p2y*a3)
+
+@jit("void(f8[:], f8[:], f8[:], f8[:], f8[:, :], f8, f8)")
+def compute_hermite_polyline(xs, ys, out_x, out_y, basis, kPB, kMB):
+    """
+    Interpolate every step of every section between the given points,
+    writing them in drawing order into the output arrays.
+    """
+    count = xs.shape[0] - 1
+    k = 0
+    for i in range(1, count):
+        # The points contributing to the section are the same for every step.
+        i0 = max(i-2, 0)
+        p0x, p0y = xs[i0], ys[i0]
+        p1x, p1y = xs[i-1], ys[i-1]
+        p2x, p2y = xs[i], ys[i]
+        p3x, p3y = xs[i+1], ys[i+1]
+        for j in range(basis.shape[0]):
+            x, y = hermite_interpolation(p0x, p0y, p1x, p1y, p2x, p2y, p3x, p3y,
+                basis[j, 0], basis[j, 1], basis[j, 2], basis[j, 3], kPB, kMB)
+            out_x[k] = x
+            out_y[k] = y
+            k += 1
+
+# The indexes of the four points that contribute to each drawn section.
+# The point after the last drawn section is only used to shape it.
+CURVE_POINT_INDEXES = np.arange(CURVE_POINTS)
+SECTION_INDEXES = np.arange(1, CURVE_SECTIONS)
+SECTION_P0 = np.maximum(SECTION_INDEXES - 2, 0)
+SECTION_P1 = SECTION_INDEXES - 1
+SECTION_P2 = SECTION_INDEXES
+SECTION_P3 = SECTION_INDEXES + 1
+
+def blend_curve(points, scalars):
+    """
+    Blend one coordinate between the ends of every section by the given
+    scalar for each step, returning the steps in drawing order.
     """
-    mu2 = mu * mu
-    mu3 = mu2 * mu
+    p1 = points[SECTION_P1, np.newaxis]
+    dp = points[SECTION_P2, np.newaxis] - p1
 
-    m0  = (p1-p0)*(1.0+bias)*(1.0-tension)/2.0
-    m0 += (p2-p1)*(1.0-bias)*(1.0-tension)/2.0
-    m1  = (p2-p1)*(1.0+bias)*(1.0-tension)/2.0
-    m1 += (p3-p2)*(1.0-bias)*(1.0-tension)/2.0
-    a0 =  2.0*mu3 - 3.0*mu2 + 1.0
-    a1 =      mu3 - 2.0*mu2 + mu
-    a2 =      mu3 -     mu2
-    a3 = -2.0*mu3 + 3.0*mu2
+    return (p1 + dp*scalars).ravel()
 
-    return p1*a0 + m0*a1 + m1*a2 + p2*a3
+def hermite_curve(points, kPB, kMB):
+    """
+    Interpolate one coordinate of the given points for every step of
+    every section at once, returning the steps in drawing order.  The
+    tangent factors are from hermite_tangent_factors.
+    """
+    p0 = points[SECTION_P0, np.newaxis]
+    p1 = points[SECTION_P1, np.newaxis]
+    p2 = points[SECTION_P2, np.newaxis]
+    p3 = points[SECTION_P3, np.newaxis]
+
+    m0 = (p1-p0)*kPB + (p2-p1)*kMB
+    m1 = (p2-p1)*kPB + (p3-p2)*kMB
 
-def xclip_far(p0, p1, x1):
-    dv = p1 - p0
-    m = dv.y / dv.x
-    c = p1.y - m * p1.x
-    return Vector2D(x1, m * x1 + c)
+    return (p1*HERMITE_A0 + m0*HERMITE_A1 + m1*HERMITE_A2 + p2*HERMITE_A3).ravel()
+
+def circle_coords(resolution):
+    coords = []
+    for i in range(resolution):
+        angle = i * 2.0 * math.pi / resolution
+        coords.extend((math.cos(angle), math.sin(angle)))
+    return coords
 
 
 ## UI.
@@ -170,14 +259,34 @@ class UIElement:
     y = 0
     width = 0
     height = 0
+    x1 = 0
+    y1 = 0
+    label_elements = ()
+
+    def set_geometry(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.x1 = x + width
+        self.y1 = y + height
 
     def within(self, x, y):
-        return x > self.x and x < self.x + self.width and \
-               y > self.y and y < self.y + self.height
+        return x > self.x and x < self.x1 and y > self.y and y < self.y1
+
+    def get_bounds(self):
+        return self.x, self.y, self.x1, self.y1
 
     def drawable(self):
         return True
 
+    def update_label_batch(self):
+        # Labels are drawn through the shared batch, so hidden elements are
+        # taken out of it rather than skipped when drawing.
+        batch = label_batch if self.drawable() else None
+        for label_element in self.label_elements:
+            label_element.batch = batch
+
     def event_press(self, x, y):
         pass
 
@@ -193,21 +302,22 @@ class UIElement:
 
 class Label(UIElement):
     def __init__(self, x, y, label="Label"):
-        self.x = x
-        self.y = y
+        self.set_geometry(x, y, 0, 0)
         self.label = label
 
         self.label_element = pyglet.text.Label(self.label,
             x=self.x,
             y=self.y,
             font_size=8,
-            anchor_x="center")
+            anchor_x="center",
+            batch=label_batch)
+        self.label_elements = (self.label_element,)
 
     def set_text(self, text):
         self.label_element.text = text
 
     def draw(self):
-        self.label_element.draw()
+        pass
 
 
 class Circle(UIElement):
@@ -215,16 +325,19 @@ class Circle(UIElement):
         self.x = x
         self.y = y
         self.radius = radius
+        self.radius2 = radius * radius
         self.colour = colour
-        self.quadric = gluNewQuadric()
-        self.resolution = 60
-        self.draw_style = NORMAL_DRAW_STYLE
+        self.selected = False
         
         self.parent = parent
         self.bounds = None
 
     def within(self, x, y):
-        return math.sqrt((x - self.x) ** 2.0 + (y - self.y) ** 2.0) < self.radius
+        dx = x - self.x
+        if dx >= self.radius or dx <= -self.radius:
+            return False
+        dy = y - self.y
+        return dx * dx + dy * dy < self.radius2
 
     def drawable(self):
         if self.parent:
@@ -232,17 +345,17 @@ class Circle(UIElement):
         return UIElement.drawable(self)
         
     def event_press(self, x, y):
-        self.draw_style = SELECTED_DRAW_STYLE
+        self.selected = True
 
     def event_release(self, x, y):
-        self.draw_style = NORMAL_DRAW_STYLE
+        self.selected = False
 
     def event_drag(self, x, y):
         if self.parent:
             self.parent.event_drag_child(self, x, y)
             return
 
-        min_y, max_y = CURVE_Y0, CURVE_Y1
+        min_y, max_y = self.get_drag_range()
 
         if y < min_y:
             y = min_y
@@ -251,13 +364,28 @@ class Circle(UIElement):
 
         self.y = y
 
+    def get_drag_range(self):
+        if self.parent:
+            return self.parent.get_child_drag_range(self)
+        return CURVE_Y0, CURVE_Y1
+
+    def get_bounds(self):
+        # Cover everywhere the circle can be dragged to, so that moving it
+        # does not change its bounds.
+        min_y, max_y = self.get_drag_range()
+        return self.x - self.radius, min_y - self.radius, self.x + self.radius, max_y + self.radius
+
     def draw(self):
         glColor4f(*self.colour)
 
         glPushMatrix()
         glTranslatef(self.x, self.y, 0.0)
-        gluQuadricDrawStyle(self.quadric, self.draw_style)
-        gluDisk(self.quadric, 0, self.radius, self.resolution, 1)
+        glScalef(self.radius, self.radius, 1.0)
+        # Only the outline is drawn while being dragged.
+        if self.selected:
+            draw_vertices(unit_circle_outline_vertices, CIRCLE_RESOLUTION, GL_LINE_LOOP)
+        else:
+            draw_vertices(unit_circle_vertices, CIRCLE_RESOLUTION + 2, GL_TRIANGLE_FAN)
         glPopMatrix()
 
 
@@ -266,20 +394,24 @@ class Button(UIElement):
     DEFAULT_HEIGHT = 20
 
     def __init__(self, x, y, width=None, height=None, label="Click", callback=None):
-        self.x = x
-        self.y = y
-        self.width = Button.DEFAULT_WIDTH if width is None else width
-        self.height = Button.DEFAULT_HEIGHT if height is None else height
+        self.set_geometry(x, y,
+            Button.DEFAULT_WIDTH if width is None else width,
+            Button.DEFAULT_HEIGHT if height is None else height)
         self.label = label
 
         self.label_element = pyglet.text.Label(self.label,
             x=self.x + self.width/2.0,
             y=self.y + self.height/2.0 + 1.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
+        self.label_elements = (self.label_element,)
 
         self.callback = callback
         self.pressed = False
 
+        w, h = self.width, self.height
+        self.border_vertices = (GLfloat * 16)(0, 0, 0, h, 0, h, w, h, w, h, w, 0, w, 0, 0, 0)
+
     def event_press(self, x, y):
         self.pressed = True
 
@@ -299,30 +431,18 @@ class Button(UIElement):
 
         glPushMatrix()
         glTranslatef(self.x, self.y, 0.0)
-        glBegin(GL_LINES)
-        glVertex2f(0, 0)
-        glVertex2f(0, self.height)
-        glVertex2f(0, self.height)
-        glVertex2f(self.width, self.height)
-        glVertex2f(self.width, self.height)
-        glVertex2f(self.width, 0)
-        glVertex2f(self.width, 0)
-        glVertex2f(0, 0)
-        glEnd()
+        draw_vertices(self.border_vertices, 8, GL_LINES)
         glPopMatrix()
 
-        self.label_element.draw()
-
 
 class SliderBox(UIElement):
     DEFAULT_WIDTH = 40
     DEFAULT_HEIGHT = 100
 
     def __init__(self, x, y, width=None, height=None, label="Slider", min_value=0.0, max_value=1.0, step_value=0.1, value=0.0, curve_types=None, callback=None):
-        self.x = x
-        self.y = y
-        self.width = SliderBox.DEFAULT_WIDTH if width is None else width
-        self.height = SliderBox.DEFAULT_HEIGHT if height is None else height
+        self.set_geometry(x, y,
+            SliderBox.DEFAULT_WIDTH if width is None else width,
+            SliderBox.DEFAULT_HEIGHT if height is None else height)
         self.label = label
         self.min_value = min_value
         self.max_value = max_value
@@ -340,20 +460,40 @@ class SliderBox(UIElement):
         self.label_element = pyglet.text.Label(self.label,
             x=self.x + self.width/2.0,
             y=self.y + self.height + self.y_margin/2.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
 
         self.max_label_element = pyglet.text.Label(str(self.max_value),
             x=self.x + self.width/2.0,
             y=self.y + self.height - self.y_margin/2.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
 
         self.min_label_element = pyglet.text.Label(str(self.min_value),
             x=self.x + self.width/2.0,
             y=self.y + self.y_margin/2.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
+
+        self.label_elements = (self.label_element, self.max_label_element, self.min_label_element)
 
         self.circle_element = Circle(self.x_track + self.circle_y_offset, self.y0_track, radius=4.0, parent=self)
-        objects.append(self.circle_element)
+
+        x0, y0 = self.x, self.y
+        x1, y1 = self.x1, self.y1
+        # The border.
+        border = [x0, y0, x1, y0, x1, y0, x1, y1, x1, y1, x0, y1, x0, y1, x0, y0]
+        self.border_vertices = (GLfloat * len(border))(*border)
+        # The length of the track.
+        track = [self.x_track, self.y0_track, self.x_track, self.y1_track]
+        # The slider notches.
+        fraction = 0.0
+        step_fraction = self.step_value / (self.max_value - self.min_value)
+        while 1.0 - fraction > -1e-5:
+            y = self.get_y_position(fraction)
+            track.extend((self.x_track - 1.0, y, self.x_track + 2.0, y))
+            fraction += step_fraction
+        self.track_vertices = (GLfloat * len(track))(*track)
 
         self.set_value(value)
 
@@ -388,8 +528,11 @@ class SliderBox(UIElement):
     def update_slider_position(self):
         self.circle_element.y = self.get_y_position(self.fraction) + self.circle_y_offset
 
+    def get_child_drag_range(self, child):
+        return self.y0_track + self.circle_y_offset, self.y1_track + self.circle_y_offset
+
     def event_drag_child(self, child, x, y):
-        min_y, max_y = self.y0_track + self.circle_y_offset, self.y1_track + self.circle_y_offset
+        min_y, max_y = self.get_child_drag_range(child)
 
         if y < min_y:
             y = min_y
@@ -401,46 +544,29 @@ class SliderBox(UIElement):
     def drawable(self):
         return self.curve_types is None or curve_type in self.curve_types
 
-    def draw(self):        
-        glPushMatrix()
-        glTranslatef(0.0, 0.0, 0.0)
+    def draw(self):
         glColor4f(*NORMAL_COLOUR)
-        glBegin(GL_LINES)
-        # The border.
-        glVertex2f(self.x, self.y)
-        glVertex2f(self.x + self.width, self.y)
-        glVertex2f(self.x + self.width, self.y)
-        glVertex2f(self.x + self.width, self.y + self.height)
-        glVertex2f(self.x + self.width, self.y + self.height)
-        glVertex2f(self.x, self.y + self.height)
-        glVertex2f(self.x, self.y + self.height)
-        glVertex2f(self.x, self.y)        
-        glEnd()        
+        draw_vertices(self.border_vertices, 8, GL_LINES)
         glColor4f(*BORDER_COLOUR)
-        glBegin(GL_LINES)
-        # The length of the track.
-        glVertex2f(self.x_track, self.y0_track)
-        glVertex2f(self.x_track, self.y1_track)
-        # The slider notches.
-        fraction = 0.0
-        step_fraction = self.step_value / (self.max_value - self.min_value)
-        while 1.0 - fraction > -1e-5:
-            y = self.get_y_position(fraction)
-            glVertex2f(self.x_track - 1.0, y)
-            glVertex2f(self.x_track + 2.0, y)
-            fraction += step_fraction
-        glEnd()
-        glPopMatrix()
+        draw_vertices(self.track_vertices, len(self.track_vertices) // 2, GL_LINES)
 
         # Now draw the contained UI elements.
-        self.label_element.draw()
-        self.min_label_element.draw()
-        self.max_label_element.draw()
         self.circle_element.draw()
 
     
 objects = []
-curve_points = []
+# The bounds of each of the objects, as rows of x0, y0, x1, y1.
+ui_bounds = np.empty((0, 4))
+label_batch = pyglet.graphics.Batch()
+
+# Circles are drawn by scaling one unit circle rather than tessellating each.
+unit_circle_coords = circle_coords(CIRCLE_RESOLUTION)
+unit_circle_outline_vertices = (GLfloat * (CIRCLE_RESOLUTION * 2))(*unit_circle_coords)
+unit_circle_vertices = (GLfloat * ((CIRCLE_RESOLUTION + 2) * 2))(
+    *([0.0, 0.0] + unit_circle_coords + unit_circle_coords[:2]))
+
+curve_ys = np.empty(CURVE_POINTS)
+curve_rng = np.random.default_rng()
 
 window_width = None
 window_height = None
@@ -452,9 +578,14 @@ hermite_tension = 0
 hermite_bias = 0
 
 
+def add_ui_element(ob):
+    global ui_bounds
+    objects.append(ob)
+    ui_bounds = np.vstack((ui_bounds, ob.get_bounds()))
+
 def create_label(x, y, **kwargs):
     ob = Label(x, y, **kwargs)
-    objects.append(ob)
+    add_ui_element(ob)
     return ob
 
 
@@ -464,66 +595,62 @@ def create_curve():
         add_curve_point()
 
 def add_curve_point(direction=1):
-    y = CURVE_Y0 + random.random() * CURVE_HEIGHT
-    point = Vector2D(0, y)
+    # The points are evenly spaced, so only their heights are stored.
+    y = CURVE_Y0 + curve_rng.random() * CURVE_HEIGHT
     if direction > 0:
-        curve_points.append(point)
-        if len(curve_points) > CURVE_POINTS:
-            del curve_points[0]
+        curve_ys[:-1] = curve_ys[1:]
+        curve_ys[-1] = y
     elif direction < 0:
-        curve_points.insert(0, point)
-        if len(curve_points) > CURVE_POINTS:
-            del curve_points[-1]
+        curve_ys[1:] = curve_ys[:-1]
+        curve_ys[0] = y
 
 def create_slider_box(x, y, **kwargs):
     ob = SliderBox(x, y, **kwargs) 
-    objects.append(ob)
+    add_ui_element(ob)
+    # After the box, so that it is found first when within the box.
+    add_ui_element(ob.circle_element)
     return ob
 
 def create_button(x, y, **kwargs):
     ob = Button(x, y, **kwargs)
-    objects.append(ob)
+    add_ui_element(ob)
     return ob
 
 def find_ui_element(x, y):
-    for ob in objects:
+    # Only the elements whose bounds contain the point need to be tested,
+    # and the last drawn elements are on top.
+    hits = np.flatnonzero((ui_bounds[:, 0] <= x) & (x <= ui_bounds[:, 2]) &
+                          (ui_bounds[:, 1] <= y) & (y <= ui_bounds[:, 3]))
+    for i in hits[::-1]:
+        ob = objects[i]
         if ob.within(x, y):
             return ob
 
 
-def draw_line(pos0, pos1, colour=None):
-    global colours_printed
-    x0, y0 = pos0
-    x1, y1 = pos1
-
-    x0_after = x0 >= window_display_x0
-    x1_after = x1 >= window_display_x0
-    x0_before = x0 <= window_display_x1
-    x1_before = x1 <= window_display_x1
-
-    if not x1_after or not x0_before:
-        return
+def draw_vertices(vertices, count, mode):
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, vertices)
+    glDrawArrays(mode, 0, count)
+    glDisableClientState(GL_VERTEX_ARRAY)
 
-    if abs(x1 - x0) > 1e-3:
-        # Skip lines that are not within the display area.
-        if not (x0_after or x1_before):
-            return
-
-        # Clip lines that cross out of the display area.        
-        if not (x0_after and x1_before):
-            if not x0_after:
-                pos0 = xclip_far(pos1, pos0, window_display_x0)
-            elif not x1_before:
-                pos1 = xclip_far(pos0, pos1, window_display_x1)
-                # print curve_type, Vector2D(x0, y0), Vector2D(x1, y1), "=>", pos0, pos1
 
-    if colour:
-        glColor4f(*colour)
+def buffer_line_strip(xs, ys):
+    """
+    Add the part of the line strip that is within the display area to
+    the curve vertex buffer, returning the vertex count.  The strip is
+    expected to extend past both sides of the display area.
+    """
+    x0, x1 = window_display_x0, window_display_x1
+    first = np.searchsorted(xs, x0, "right")
+    last = np.searchsorted(xs, x1, "left")
+    count = int(last - first) + 2
 
-    glBegin(GL_LINES)
-    glVertex2f(*pos0)
-    glVertex2f(*pos1)
-    glEnd()
+    # Only the end points need to be clipped, the ones between are copied.
+    curve_vertices[1:count-1, 0] = xs[first:last]
+    curve_vertices[1:count-1, 1] = ys[first:last]
+    curve_vertices[0] = x0, np.interp(x0, xs[first-1:first+1], ys[first-1:first+1])
+    curve_vertices[count-1] = x1, np.interp(x1, xs[last-1:last+1], ys[last-1:last+1])
+    return count
 
 
 curve_scroll_seconds = INITIAL_CURVE_SCROLL_PERIOD
@@ -535,6 +662,37 @@ section_dt = 0.0
 current_step = 0.0
 
 
+curve_vertex_list = pyglet.graphics.vertex_list(CURVE_MAX_VERTICES, 'v2f/stream')
+# The curve is calculated into this buffer, and then copied to the vertex list.
+curve_vertex_buffer = (GLfloat * (CURVE_MAX_VERTICES * 2))()
+curve_vertices = np.frombuffer(curve_vertex_buffer, np.float32).reshape(CURVE_MAX_VERTICES, 2)
+line_vertices = np.empty((CURVE_LINE_VERTICES, 2))
+
+
+def get_linear_lines(xs, ys):
+    return xs[:CURVE_SECTIONS], ys[:CURVE_SECTIONS]
+
+def get_smoothstep_lines(xs, ys):
+    line_vertices[0] = xs[0], ys[0]
+    line_vertices[1:, 0] = blend_curve(xs, SECTION_MU)
+    line_vertices[1:, 1] = blend_curve(ys, SMOOTH_STEP_TABLE)
+    return line_vertices[:, 0], line_vertices[:, 1]
+
+def get_hermite_lines(xs, ys):
+    kPB, kMB = hermite_tangent_factors(tension_slider_box.get_value(), bias_slider_box.get_value())
+
+    line_vertices[0] = xs[0], ys[0]
+    if numba is not None:
+        compute_hermite_polyline(xs, ys, line_vertices[1:, 0], line_vertices[1:, 1],
+            HERMITE_BASIS, kPB, kMB)
+    else:
+        line_vertices[1:, 0] = hermite_curve(xs, kPB, kMB)
+        line_vertices[1:, 1] = hermite_curve(ys, kPB, kMB)
+    return line_vertices[:, 0], line_vertices[:, 1]
+
+# Indexed by line type.
+get_lines_functions = (get_linear_lines, get_smoothstep_lines, get_hermite_lines)
+
 def draw_lines(line_type):
     """
     TODO: Determine which points to interpolate between.
@@ -545,73 +703,26 @@ def draw_lines(line_type):
     global window_display_x0, window_display_x1
     """
 
-    if len(curve_points) == 0:
-        return
-
     step_fraction = current_step * CURVE_SUBDIVISION_FRACTION
 
+    x_start = window_display_x0 - 1.0 * curve_section_width
+    x_start -= curve_section_width * step_fraction
+    xs = x_start + CURVE_POINT_INDEXES * curve_section_width
+
+    line_xs, line_ys = get_lines_functions[line_type](xs, curve_ys)
+    count = buffer_line_strip(line_xs, line_ys)
+    # The visible part of the strip changes length as it scrolls.
+    if curve_vertex_list.get_size() != count:
+        curve_vertex_list.resize(count)
+    ctypes.memmove(curve_vertex_list.vertices, curve_vertex_buffer,
+        count * 2 * ctypes.sizeof(GLfloat))
+
     glColor4f(*NORMAL_COLOUR)
+    curve_vertex_list.draw(GL_LINE_STRIP)
 
-    if line_type == LINES_LINEAR:
-        x_start = window_display_x0 - 1.0 * curve_section_width
-        x_start -= curve_section_width * step_fraction
-        for i in range(CURVE_SECTIONS):
-            if i > 0:
-                point0 = curve_points[i-1]
-                point0.x = x_start
-                point1 = curve_points[i-0]
-                point1.x = x_start + curve_section_width
-                draw_line(point0, point1)
-
-                x_start += curve_section_width
-
-    elif line_type in (LINES_SMOOTHSTEP, LINES_HERMITE):
-        tension_value = tension_slider_box.get_value()
-        bias_value = bias_slider_box.get_value()
-
-        x_start = window_display_x0 - 1.0 * curve_section_width
-        x_start -= curve_section_width * step_fraction
-        for i in range(CURVE_SECTIONS):
-            if i > 0:
-                point0 = curve_points[i-1]
-                point0.x = x_start
-                y0 = point0.y
-                p0 = point0
-                point1 = curve_points[i-0]
-                point1.x = x_start + curve_section_width
-                x_start += curve_section_width
-                
-                if point1.x < window_display_x0 or point0.x > window_display_x1:
-                    continue
-
-                for j in range(CURVE_SECTION_SUBDIVISIONS):
-                    x_fraction = j * CURVE_SUBDIVISION_FRACTION
-
-                    x0 = point0.x + x_fraction * curve_section_width
-                    x1 = x0 + CURVE_SUBDIVISION_FRACTION * curve_section_width
-
-                    if line_type == LINES_SMOOTHSTEP:
-                        y_fraction = smooth_step_interpolation(x_fraction + CURVE_SUBDIVISION_FRACTION)
-                        y1 = (point1.y * y_fraction) + (point0.y * (1 - y_fraction))
-                        draw_line(Vector2D(x0, y0), Vector2D(x1, y1))
-                        y0 = y1
-                    elif line_type == LINES_HERMITE:
-                        mu = x_fraction + CURVE_SUBDIVISION_FRACTION
-                        p1 = hermite_interpolation(
-                            Vector2D(curve_points[i-2]),
-                            Vector2D(curve_points[i-1]),
-                            Vector2D(curve_points[i-0]),
-                            Vector2D(curve_points[i+1]),
-                            mu,
-                            tension_value,
-                            bias_value)
-                        draw_line(p0, p1)
-                        p0 = p1
-        
 
 def on_randomise_button_press(button):
-    for curve_point in curve_points:
-        curve_point.y = CURVE_Y0 + random.random() * CURVE_HEIGHT
+    curve_ys[:] = CURVE_Y0 + curve_rng.random(CURVE_POINTS) * CURVE_HEIGHT
 
 def on_next_curve_type_button_press(button):
     global curve_type
@@ -620,6 +731,8 @@ def on_next_curve_type_button_press(button):
 
 def set_curve_type(new_curve_type):
     curve_label.set_text("Curve: "+ line_labels[new_curve_type])
+    for ob in objects:
+        ob.update_label_batch()
 
 def set_curve_scroll_seconds(seconds):
     global section_ms, curve_scroll_seconds
@@ -675,6 +788,8 @@ def run():
             if ob.drawable():
                 ob.draw()
 
+        label_batch.draw()
+
     @window.event
     def on_key_press(symbol, modifiers):
         if symbol == key.ESCAPE:
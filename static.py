@@ -21,6 +21,8 @@ Dependencies
 ------------
 
 Pyglet
+NumPy
+Numba (optional, compiles the Hermite curve interpolation)
 
 Testing
 -------
@@ -29,7 +31,12 @@ It was written using Python 2.6 on Windows and has not been tested on other
 platforms.
 """
 
-import random, math, sys
+import random, math, sys, ctypes
+import numpy as np
+try:
+    import numba
+except ImportError:
+    numba = None
 import pyglet
 from pyglet.window import key, mouse
 from pyglet.gl import *
@@ -38,12 +45,13 @@ from pyglet.gl import *
 NUM_CURVE_SLIDERS = 6                   # How many draggable points there are.
 NUM_SECTION_STEPS = 20                  # How many curve subdivisions between points.
 SLIDER_RADIUS = 4                       # How big each draggable point is.
+CURVE_VERTEX_COUNT = (NUM_CURVE_SLIDERS - 1) * NUM_SECTION_STEPS + 1
 
 NORMAL_COLOUR = (1.0, 1.0, 1.0, 1.0)
 BORDER_COLOUR = (0.7, 0.7, 0.7, 1.0)
 
-NORMAL_DRAW_STYLE = GLU_FILL            # Draw style when not being dragged.
-SELECTED_DRAW_STYLE = GLU_SILHOUETTE    # Draw style when being dragged.
+CIRCLE_RESOLUTION = 60                  # How many segments circles are drawn with.
+UI_GRID_CELL_SIZE = 64                  # How big each cell used to find UI elements is.
 
 NUM_LINE_TYPES = 3
 LINES_LINEAR, LINES_SMOOTHSTEP, LINES_HERMITE = range(NUM_LINE_TYPES)
@@ -57,9 +65,11 @@ line_labels = {
 }
 
 
-class Vector2D:
+class Vector2D(object):
+    __slots__ = ("x", "y")
+
     def __init__(self, *args):
-        if len(args) == 1 and type(args[0]) is type(self):
+        if len(args) == 1 and isinstance(args[0], Vector2D):
             self.x = args[0].x
             self.y = args[0].y
         else:
@@ -70,22 +80,17 @@ class Vector2D:
         return "(%0.2f, %0.2f)" % (self.x, self.y)
 
     def __mul__(self, other):
-        v = Vector2D(self.x, self.y)
-        if type(other) in (float, int):
-            v.x *= other
-            v.y *= other
-        else:
-            raise Exception("unhandled operation", self, other)
-        return v
+        if isinstance(other, (int, float)):
+            return Vector2D(self.x * other, self.y * other)
+        raise Exception("unhandled operation", self, other)
 
-    def __div__(self, other):
-        v = Vector2D(self.x, self.y)
-        if type(other) in (float, int):
-            v.x /= other
-            v.y /= other
-        else:
-            raise Exception("unhandled operation", self, other)
-        return v
+    def __truediv__(self, other):
+        if isinstance(other, (int, float)):
+            return Vector2D(self.x / other, self.y / other)
+        raise Exception("unhandled operation", self, other)
+
+    # Python 2 only calls __div__.
+    __div__ = __truediv__
         
     def __add__(self, other):
         v = Vector2D(self.x, self.y)
@@ -100,34 +105,130 @@ class Vector2D:
         return v    
 
 
+def jit(*args):
+    """
+    Compile the decorated function with Numba when it is available,
+    otherwise leave it to run as normal Python.
+    """
+    if numba is None:
+        return lambda function: function
+    return numba.njit(*args, cache=True, fastmath=True)
+
+
 def smooth_step_interpolation(v):
     return (v * v * (3.0 - 2.0 * v))
 
-def hermite_interpolation(p0, p1, p2, p3, mu, tension, bias):
+def hermite_tangent_factors(tension, bias):
+    kT = (1.0 - tension) * 0.5
+    return (1.0 + bias) * kT, (1.0 - bias) * kT
+
+@jit("UniTuple(f8, 2)(f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8)")
+def hermite_interpolation(p0x, p0y, p1x, p1y, p2x, p2y, p3x, p3y, a0, a1, a2, a3, kPB, kMB):
     """
     Taken from:
       http://local.wasp.uwa.edu.au/~pbourke/miscellaneous/interpolation/
+
+    The points are passed as separate components, along with the basis
+    function values for the step and the tangent factors from
+    hermite_tangent_factors, and the interpolated point is returned as
+    an (x, y) tuple.
     """
-    mu2 = mu * mu
-    mu3 = mu2 * mu
+    m0x = (p1x-p0x)*kPB + (p2x-p1x)*kMB
+    m0y = (p1y-p0y)*kPB + (p2y-p1y)*kMB
+    m1x = (p2x-p1x)*kPB + (p3x-p2x)*kMB
+    m1y = (p2y-p1y)*kPB + (p3y-p2y)*kMB
+
+    return (p1x*a0 + m0x*a1 + m1x*a2 + p2x*a3,
+            p1y*a0 + m0y*a1 + m1y*a2 + p2y*a3)
 
-    m0  = (p1-p0)*(1.0+bias)*(1.0-tension)/2.0
-    m0 += (p2-p1)*(1.0-bias)*(1.0-tension)/2.0
-    m1  = (p2-p1)*(1.0+bias)*(1.0-tension)/2.0
-    m1 += (p3-p2)*(1.0-bias)*(1.0-tension)/2.0
-    a0 =  2.0*mu3 - 3.0*mu2 + 1.0
-    a1 =      mu3 - 2.0*mu2 + mu
-    a2 =      mu3 -     mu2
-    a3 = -2.0*mu3 + 3.0*mu2
+@jit("void(f8[:], f8[:], f4[:], f4[:], f8[:, :], f8, f8)")
+def compute_hermite_polyline(xs, ys, out_x, out_y, basis, kPB, kMB):
+    """
+    Interpolate every step of every section between the given points,
+    writing them in drawing order into the output arrays.
+    """
+    count = xs.shape[0]
+    k = 0
+    for i in range(1, count):
+        # The points contributing to the section are the same for every step.
+        i0 = max(i-2, 0)
+        i3 = min(i+1, count-1)
+        p0x, p0y = xs[i0], ys[i0]
+        p1x, p1y = xs[i-1], ys[i-1]
+        p2x, p2y = xs[i], ys[i]
+        p3x, p3y = xs[i3], ys[i3]
+        for j in range(basis.shape[0]):
+            x, y = hermite_interpolation(p0x, p0y, p1x, p1y, p2x, p2y, p3x, p3y,
+                basis[j, 0], basis[j, 1], basis[j, 2], basis[j, 3], kPB, kMB)
+            out_x[k] = x
+            out_y[k] = y
+            k += 1
+
+# The Hermite basis functions only depend on how far along a section the
+# step is, so they are the same for every section and every frame.
+SECTION_MU = np.arange(1, NUM_SECTION_STEPS + 1) * (1.0 / NUM_SECTION_STEPS)
+SECTION_MU2 = SECTION_MU * SECTION_MU
+SECTION_MU3 = SECTION_MU2 * SECTION_MU
+HERMITE_A0 =  2.0*SECTION_MU3 - 3.0*SECTION_MU2 + 1.0
+HERMITE_A1 =      SECTION_MU3 - 2.0*SECTION_MU2 + SECTION_MU
+HERMITE_A2 =      SECTION_MU3 -     SECTION_MU2
+HERMITE_A3 = -2.0*SECTION_MU3 + 3.0*SECTION_MU2
+HERMITE_BASIS = np.column_stack((HERMITE_A0, HERMITE_A1, HERMITE_A2, HERMITE_A3))
+
+# The indexes of the four points that contribute to each section.
+SECTION_INDEXES = np.arange(1, NUM_CURVE_SLIDERS)
+SECTION_P0 = np.maximum(SECTION_INDEXES - 2, 0)
+SECTION_P1 = SECTION_INDEXES - 1
+SECTION_P2 = SECTION_INDEXES
+SECTION_P3 = np.minimum(SECTION_INDEXES + 1, NUM_CURVE_SLIDERS - 1)
+
+# The smooth step scalars are fixed in the same way.
+SMOOTH_STEP_TABLE = smooth_step_interpolation(SECTION_MU)
+
+def blend_curve(points, scalars):
+    """
+    Blend one coordinate between the ends of every section by the given
+    scalar for each step, returning the steps in drawing order.
+    """
+    p1 = points[SECTION_P1, np.newaxis]
+    dp = points[SECTION_P2, np.newaxis] - p1
+
+    return (p1 + dp*scalars).ravel()
+
+def hermite_curve(points, kPB, kMB):
+    """
+    Interpolate one coordinate of the given points for every step of
+    every section at once, returning the steps in drawing order.  The
+    tangent factors are from hermite_tangent_factors.
+    """
+    p0 = points[SECTION_P0, np.newaxis]
+    p1 = points[SECTION_P1, np.newaxis]
+    p2 = points[SECTION_P2, np.newaxis]
+    p3 = points[SECTION_P3, np.newaxis]
 
-    return p1*a0 + m0*a1 + m1*a2 + p2*a3
+    m0 = (p1-p0)*kPB + (p2-p1)*kMB
+    m1 = (p2-p1)*kPB + (p3-p2)*kMB
 
+    return (p1*HERMITE_A0 + m0*HERMITE_A1 + m1*HERMITE_A2 + p2*HERMITE_A3).ravel()
 
-class UIElement:
-    x = 0
-    y = 0
-    width = 0
-    height = 0
+
+def circle_coords(resolution):
+    coords = []
+    for i in range(resolution):
+        angle = i * 2.0 * math.pi / resolution
+        coords.extend((math.cos(angle), math.sin(angle)))
+    return coords
+
+
+class UIElement(object):
+    __slots__ = ("x", "y", "width", "height", "label_elements")
+
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.label_elements = ()
 
     def within(self, x, y):
         return x > self.x and x < self.x + self.width and y > self.y and y < self.y + self.height
@@ -135,6 +236,16 @@ class UIElement:
     def drawable(self):
         return True
 
+    def get_bounds(self):
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def update_label_batch(self):
+        # Labels are drawn through the shared batch, so hidden elements are
+        # taken out of it rather than skipped when drawing.
+        batch = label_batch if self.drawable() else None
+        for label_element in self.label_elements:
+            label_element.batch = batch
+
     def event_press(self, x, y):
         pass
 
@@ -149,39 +260,55 @@ class UIElement:
 
 
 class Label(UIElement):
+    __slots__ = ("label", "labelElement")
+
     def __init__(self, x, y, label="Label"):
-        self.x = x
-        self.y = y
+        UIElement.__init__(self, x, y)
         self.label = label
 
         self.labelElement = pyglet.text.Label(self.label,
             x=self.x,
             y=self.y,
             font_size=8,
-            anchor_x="center")
+            anchor_x="center",
+            batch=label_batch)
+        self.label_elements = (self.labelElement,)
 
     def set_text(self, text):
         self.labelElement.text = text
 
     def draw(self):
-        self.labelElement.draw()
+        # The text is drawn as part of the label batch.
+        pass
 
 
 class Circle(UIElement):
+    __slots__ = ("radius", "colour", "selected", "parent", "bounds")
+
     def __init__(self, x, y, radius=10.0, colour=NORMAL_COLOUR, parent=None):
-        self.x = x
-        self.y = y
+        UIElement.__init__(self, x, y)
         self.radius = radius
         self.colour = colour
-        self.quadric = gluNewQuadric()
-        self.circleresolution = 60
-        self.draw_style = NORMAL_DRAW_STYLE
+        self.selected = False
         
         self.parent = parent
         self.bounds = None
 
     def within(self, x, y):
-        return math.sqrt((x - self.x) ** 2.0 + (y - self.y) ** 2.0) < self.radius
+        dx = x - self.x
+        dy = y - self.y
+        return dx * dx + dy * dy < self.radius * self.radius
+
+    def get_bounds(self):
+        # Cover everywhere the circle can be dragged to, so that moving it
+        # does not require it to be refiled in the UI grid.
+        min_y, max_y = self.get_drag_range()
+        return self.x - self.radius, min_y - self.radius, self.x + self.radius, max_y + self.radius
+
+    def get_drag_range(self):
+        if self.parent:
+            return self.parent.get_child_drag_range(self)
+        return window_y_border, window_y_display + window_y_border
 
     def drawable(self):
         if self.parent:
@@ -189,17 +316,18 @@ class Circle(UIElement):
         return UIElement.drawable(self)
         
     def event_press(self, x, y):
-        self.draw_style = SELECTED_DRAW_STYLE
+        self.selected = True
 
     def event_release(self, x, y):
-        self.draw_style = NORMAL_DRAW_STYLE
+        self.selected = False
 
     def event_drag(self, x, y):
         if self.parent:
             self.parent.event_drag_child(self, x, y)
             return
 
-        min_y, max_y = window_y_border, window_y_display + window_y_border
+        global curve_dirty
+        min_y, max_y = self.get_drag_range()
 
         if y < min_y:
             y = min_y
@@ -207,29 +335,39 @@ class Circle(UIElement):
             y = max_y
 
         self.y = y
+        curve_dirty = True
 
     def draw(self):
         glColor4f(*self.colour)
 
         glPushMatrix()
         glTranslatef(self.x, self.y, 0.0)
-        gluQuadricDrawStyle(self.quadric, self.draw_style)
-        gluDisk(self.quadric, 0, self.radius, self.circleresolution, 1)
+        glScalef(self.radius, self.radius, 1.0)
+        # Only the outline is drawn while being dragged.
+        if self.selected:
+            unit_circle_outline_vertex_list.draw(GL_LINE_LOOP)
+        else:
+            unit_circle_vertex_list.draw(GL_TRIANGLE_FAN)
         glPopMatrix()
 
 
 class Button(UIElement):
+    __slots__ = ("label", "labelElement", "border_vertex_list", "callback", "pressed")
+
     def __init__(self, x, y, width=80, height=20, label="Click", callback=None):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
+        UIElement.__init__(self, x, y, width, height)
         self.label = label
 
         self.labelElement = pyglet.text.Label(self.label,
             x=self.x + self.width/2.0,
             y=self.y + self.height/2.0 + 1.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
+        self.label_elements = (self.labelElement,)
+
+        w, h = self.width, self.height
+        self.border_vertex_list = pyglet.graphics.vertex_list(4,
+            ('v2f/static', (0, 0, 0, h, w, h, w, 0)))
 
         self.callback = callback
         self.pressed = False
@@ -252,27 +390,18 @@ class Button(UIElement):
             glColor4f(*NORMAL_COLOUR)
         glPushMatrix()
         glTranslatef(self.x, self.y, 0.0)
-        glBegin(GL_LINES)
-        glVertex2f(0, 0)
-        glVertex2f(0, self.height)
-        glVertex2f(0, self.height)
-        glVertex2f(self.width, self.height)
-        glVertex2f(self.width, self.height)
-        glVertex2f(self.width, 0)
-        glVertex2f(self.width, 0)
-        glVertex2f(0, 0)
-        glEnd()
+        self.border_vertex_list.draw(GL_LINE_LOOP)
         glPopMatrix()
 
-        self.labelElement.draw()
-
 
 class SliderBox(UIElement):
+    __slots__ = ("label", "min_value", "max_value", "step_value", "fraction", "value",
+        "y_margin", "x_track", "y0_track", "y1_track", "track_height", "circle_y_offset",
+        "labelElement", "maxLabelElement", "minLabelElement",
+        "border_vertex_list", "track_vertex_list", "circleElement")
+
     def __init__(self, x, y, width=40, height=100, label="Slider", min_value=0.0, max_value=1.0, step_value=0.1, value=0.0):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
+        UIElement.__init__(self, x, y, width, height)
         self.label = label
         self.min_value = min_value
         self.max_value = max_value
@@ -288,20 +417,42 @@ class SliderBox(UIElement):
         self.labelElement = pyglet.text.Label(self.label,
             x=self.x + self.width/2.0,
             y=self.y + self.height + self.y_margin/2.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
 
         self.maxLabelElement = pyglet.text.Label(str(self.max_value),
             x=self.x + self.width/2.0,
             y=self.y + self.height - self.y_margin/2.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
 
         self.minLabelElement = pyglet.text.Label(str(self.min_value),
             x=self.x + self.width/2.0,
             y=self.y + self.y_margin/2.0,
-            font_size=8, anchor_x="center", anchor_y="center")
+            font_size=8, anchor_x="center", anchor_y="center",
+            batch=label_batch)
+
+        self.label_elements = (self.labelElement, self.maxLabelElement, self.minLabelElement)
+
+        # The border.
+        x0, y0 = self.x, self.y
+        x1, y1 = self.x + self.width, self.y + self.height
+        self.border_vertex_list = pyglet.graphics.vertex_list(4,
+            ('v2f/static', (x0, y0, x1, y0, x1, y1, x0, y1)))
+
+        # The length of the track.
+        track_coords = [self.x_track, self.y0_track, self.x_track, self.y1_track]
+        # The slider notches, one for each step including both ends.
+        step_fraction = self.step_value / (self.max_value - self.min_value)
+        num_notches = int((1.0 + 1e-5) / step_fraction) + 1
+        for i in range(num_notches):
+            y = self.get_y_position(i * step_fraction)
+            track_coords.extend((self.x_track - 1.0, y, self.x_track + 2.0, y))
+        self.track_vertex_list = pyglet.graphics.vertex_list(len(track_coords) // 2,
+            ('v2f/static', track_coords))
 
         self.circleElement = Circle(self.x_track + self.circle_y_offset, self.y0_track, radius=4.0, parent=self)
-        objects.append(self.circleElement)
+        add_ui_element(self.circleElement)
 
         self.set_value(value)
 
@@ -312,6 +463,7 @@ class SliderBox(UIElement):
         self.set_value_fraction(fraction)
 
     def set_value_fraction(self, fraction):        
+        global curve_dirty
         step_fraction = self.step_value / (self.max_value - self.min_value)
         fraction_divisor = fraction // step_fraction
         fraction_modulo = fraction % step_fraction        
@@ -321,11 +473,13 @@ class SliderBox(UIElement):
             fraction += step_fraction
 
         self.fraction = fraction
+        self.value = self.min_value + fraction * (self.max_value - self.min_value)
+        curve_dirty = True
                 
         self.update_slider_position()
 
     def get_value(self):
-        return self.min_value + self.fraction * (self.max_value - self.min_value)
+        return self.value
 
     def get_y_position(self, fraction):
         return self.y0_track + fraction * self.track_height
@@ -333,8 +487,11 @@ class SliderBox(UIElement):
     def update_slider_position(self):
         self.circleElement.y = self.get_y_position(self.fraction) + self.circle_y_offset
 
+    def get_child_drag_range(self, child):
+        return self.y0_track + self.circle_y_offset, self.y1_track + self.circle_y_offset
+
     def event_drag_child(self, child, x, y):
-        min_y, max_y = self.y0_track + self.circle_y_offset, self.y1_track + self.circle_y_offset
+        min_y, max_y = self.get_child_drag_range(child)
 
         if y < min_y:
             y = min_y
@@ -346,58 +503,60 @@ class SliderBox(UIElement):
     def drawable(self):
         return curve_type == LINES_HERMITE
 
-    def draw(self):        
-        glPushMatrix()
-        glTranslatef(0.0, 0.0, 0.0)
+    def draw(self):
         glColor4f(*NORMAL_COLOUR)
-        glBegin(GL_LINES)
-        # The border.
-        glVertex2f(self.x, self.y)
-        glVertex2f(self.x + self.width, self.y)
-        glVertex2f(self.x + self.width, self.y)
-        glVertex2f(self.x + self.width, self.y + self.height)
-        glVertex2f(self.x + self.width, self.y + self.height)
-        glVertex2f(self.x, self.y + self.height)
-        glVertex2f(self.x, self.y + self.height)
-        glVertex2f(self.x, self.y)        
-        glEnd()        
+        self.border_vertex_list.draw(GL_LINE_LOOP)
         glColor4f(*BORDER_COLOUR)
-        glBegin(GL_LINES)
-        # The length of the track.
-        glVertex2f(self.x_track, self.y0_track)
-        glVertex2f(self.x_track, self.y1_track)
-        # The slider notches.
-        fraction = 0.0
-        step_fraction = self.step_value / (self.max_value - self.min_value)
-        while 1.0 - fraction > -1e-5:
-            y = self.get_y_position(fraction)
-            glVertex2f(self.x_track - 1.0, y)
-            glVertex2f(self.x_track + 2.0, y)
-            fraction += step_fraction
-        glEnd()
-        glPopMatrix()
+        self.track_vertex_list.draw(GL_LINES)
 
         # Now draw the contained UI elements.
-        self.labelElement.draw()
-        self.minLabelElement.draw()
-        self.maxLabelElement.draw()
         self.circleElement.draw()
 
     
 objects = []
+drawable_objects = []
 curve_sliders = []
+label_batch = pyglet.graphics.Batch()
+linear_vertex_list = pyglet.graphics.vertex_list(NUM_CURVE_SLIDERS, 'v2f/stream')
+curve_vertex_list = pyglet.graphics.vertex_list(CURVE_VERTEX_COUNT, 'v2f/stream')
+# The curve is calculated into this buffer, and then copied to a vertex list.
+curve_vertex_buffer = (GLfloat * (CURVE_VERTEX_COUNT * 2))()
+curve_vertices = np.frombuffer(curve_vertex_buffer, np.float32).reshape(CURVE_VERTEX_COUNT, 2)
+# All circles are drawn from the one unit circle, scaled to their radius.
+unit_circle_coords = circle_coords(CIRCLE_RESOLUTION)
+unit_circle_outline_vertex_list = pyglet.graphics.vertex_list(CIRCLE_RESOLUTION,
+    ('v2f/static', unit_circle_coords))
+unit_circle_vertex_list = pyglet.graphics.vertex_list(CIRCLE_RESOLUTION + 2,
+    ('v2f/static', [0.0, 0.0] + unit_circle_coords + unit_circle_coords[:2]))
 window_width = None
 window_height = None
 window_y_border = 60.0
 window_y_display = None
 selected_ui_element = None
+ui_grid = {}
+curve_dirty = True
 hermite_tension = 0
 hermite_bias = 0
 
 
+def add_ui_element(ob):
+    objects.append(ob)
+    add_to_ui_grid(ob)
+
+def add_to_ui_grid(ob):
+    x0, y0, x1, y1 = ob.get_bounds()
+    for i in range(int(x0) // UI_GRID_CELL_SIZE, int(x1) // UI_GRID_CELL_SIZE + 1):
+        for j in range(int(y0) // UI_GRID_CELL_SIZE, int(y1) // UI_GRID_CELL_SIZE + 1):
+            ui_grid.setdefault((i, j), []).append(ob)
+
+def rebuild_ui_grid():
+    ui_grid.clear()
+    for ob in objects:
+        add_to_ui_grid(ob)
+
 def create_label(x, y, **kwargs):
     ob = Label(x, y, **kwargs)
-    objects.append(ob)
+    add_ui_element(ob)
     return ob
 
 def create_curve_sliders():
@@ -408,86 +567,81 @@ def create_curve_sliders():
         y = window_height - window_y_border - random.random() * window_y_display
         circle = Circle(x, y, SLIDER_RADIUS)
         curve_sliders.append(circle)
-
-    objects.extend(curve_sliders)
+        add_ui_element(circle)
 
 def create_slider_box(x, y, **kwargs):
     ob = SliderBox(x, y, **kwargs) 
-    objects.append(ob)
+    add_ui_element(ob)
     return ob
 
 def create_button(x, y, **kwargs):
     ob = Button(x, y, **kwargs)
-    objects.append(ob)
+    add_ui_element(ob)
     return ob
 
 def find_ui_element(x, y):
-    for ob in objects:
+    cell = (int(x) // UI_GRID_CELL_SIZE, int(y) // UI_GRID_CELL_SIZE)
+    for ob in ui_grid.get(cell, ()):
         if ob.within(x, y):
             return ob
 
-def draw_line(startPosition, endPosition):
-    glBegin(GL_LINES)
-    glVertex2f(*startPosition)
-    glVertex2f(*endPosition)
-    glEnd()
-
 
+def get_curve_slider_positions():
+    xs = np.fromiter((s.x for s in curve_sliders), float, NUM_CURVE_SLIDERS)
+    ys = np.fromiter((s.y for s in curve_sliders), float, NUM_CURVE_SLIDERS)
+    return xs, ys
+
+def upload_curve_vertices(vertex_list, vertex_count):
+    ctypes.memmove(vertex_list.vertices, curve_vertex_buffer,
+        vertex_count * 2 * ctypes.sizeof(GLfloat))
+
+def update_linear_lines():
+    xs, ys = get_curve_slider_positions()
+    curve_vertices[:NUM_CURVE_SLIDERS, 0] = xs
+    curve_vertices[:NUM_CURVE_SLIDERS, 1] = ys
+    upload_curve_vertices(linear_vertex_list, NUM_CURVE_SLIDERS)
+
+def update_smoothstep_lines():
+    xs, ys = get_curve_slider_positions()
+    curve_vertices[0] = xs[0], ys[0]
+    curve_vertices[1:, 0] = blend_curve(xs, SECTION_MU)
+    curve_vertices[1:, 1] = blend_curve(ys, SMOOTH_STEP_TABLE)
+    upload_curve_vertices(curve_vertex_list, CURVE_VERTEX_COUNT)
+
+def update_hermite_lines():
+    xs, ys = get_curve_slider_positions()
+    kPB, kMB = hermite_tangent_factors(tension_slider_box.value, bias_slider_box.value)
+
+    curve_vertices[0] = xs[0], ys[0]
+    if numba is not None:
+        compute_hermite_polyline(xs, ys, curve_vertices[1:, 0], curve_vertices[1:, 1],
+            HERMITE_BASIS, kPB, kMB)
+    else:
+        curve_vertices[1:, 0] = hermite_curve(xs, kPB, kMB)
+        curve_vertices[1:, 1] = hermite_curve(ys, kPB, kMB)
+    upload_curve_vertices(curve_vertex_list, CURVE_VERTEX_COUNT)
+
+# Indexed by line type.
+update_lines_functions = (update_linear_lines, update_smoothstep_lines, update_hermite_lines)
+line_vertex_lists = (linear_vertex_list, curve_vertex_list, curve_vertex_list)
 
 def draw_lines(lineType):
-    glColor4f(*NORMAL_COLOUR)
+    global curve_dirty
 
-    if lineType == LINES_LINEAR:
-        last_curve_slider = curve_sliders[0]
-        for i in range(NUM_CURVE_SLIDERS):
-            curve_slider = curve_sliders[i]
-            if curve_slider is last_curve_slider:
-                continue
-            draw_line((last_curve_slider.x, last_curve_slider.y), (curve_slider.x, curve_slider.y))
-            last_curve_slider = curve_slider
-
-    elif lineType in (LINES_SMOOTHSTEP, LINES_HERMITE):
-        last_curve_slider = curve_sliders[0]
-        y0 = last_curve_slider.y
-        p0 = Vector2D(last_curve_slider)
-        stepFraction = 1.0 / NUM_SECTION_STEPS
-        
-        tension_value = tension_slider_box.get_value()
-        bias_value = bias_slider_box.get_value()
-        
-        for i in range(1, NUM_CURVE_SLIDERS):
-            curve_slider = curve_sliders[i]
-            xStart = last_curve_slider.x
-            xEnd = curve_slider.x
-            xWidth = xEnd - xStart
-            for j in range(NUM_SECTION_STEPS):
-                xFraction = j * stepFraction
-                x0 = xStart + xFraction * xWidth
-                x1 = x0 + (stepFraction * xWidth)
-                if lineType == LINES_SMOOTHSTEP:
-                    mu = xFraction + stepFraction
-                    yScalar = smooth_step_interpolation(mu)
-                    y1 = (curve_slider.y * yScalar) + (last_curve_slider.y * (1 - yScalar))
-                    draw_line((x0, y0), (x1, y1))
-                    y0 = y1
-                elif lineType == LINES_HERMITE:
-                    mu = xFraction + stepFraction
-                    p1 = hermite_interpolation(
-                        Vector2D(curve_sliders[max(i-2, 0)]),
-                        Vector2D(curve_sliders[max(i-1, 0)]),
-                        Vector2D(curve_sliders[i]),
-                        Vector2D(curve_sliders[min(i+1, NUM_CURVE_SLIDERS-1)]),
-                        mu,
-                        tension_value,
-                        bias_value)
-                    draw_line((p0.x, p0.y), (p1.x, p1.y))
-                    p0 = p1
-            last_curve_slider = curve_slider
+    # The curve is only recalculated when something that shapes it changes.
+    if curve_dirty:
+        update_lines_functions[lineType]()
+        curve_dirty = False
+
+    glColor4f(*NORMAL_COLOUR)
+    line_vertex_lists[lineType].draw(GL_LINE_STRIP)
 
 
 def on_reset_button_press(button):
+    global curve_dirty
     for curve_slider in curve_sliders:
         curve_slider.y = window_height - window_y_border - random.random() * window_y_display
+    curve_dirty = True
 
 def on_next_curve_type_button_press(button):
     global curve_type
@@ -495,7 +649,16 @@ def on_next_curve_type_button_press(button):
     set_curve_type(curve_type)
 
 def set_curve_type(new_curve_type):
+    global curve_dirty
     curve_label.set_text("Curve: "+ line_labels[new_curve_type])
+    curve_dirty = True
+
+    # Which elements are shown only changes with the curve type.
+    del drawable_objects[:]
+    for ob in objects:
+        ob.update_label_batch()
+        if ob.drawable():
+            drawable_objects.append(ob)
 
 
 
@@ -514,9 +677,10 @@ def run():
         
         draw_lines(curve_type)
 
-        for ob in objects:
-            if ob.drawable():
-                ob.draw()
+        for ob in drawable_objects:
+            ob.draw()
+
+        label_batch.draw()
 
     @window.event
     def on_key_press(symbol, modifiers):
@@ -532,6 +696,9 @@ def run():
         
         window_y_display = window_height - (window_y_border * 2.0)
 
+        # The area the curve sliders can be dragged over has changed.
+        rebuild_ui_grid()
+
     @window.event
     def on_mouse_press(x, y, button, modifiers):
         global selected_ui_element